@@ -1,3 +1,4 @@
+from operator import itemgetter
 from typing import Any
 
 from sqladmin import ModelView
@@ -15,7 +16,7 @@ class CustomModelConverter(ModelConverter):
         session_maker: sessionmaker,
     ) -> list[tuple[str, Any]]:
         res = await super()._prepare_select_options(prop=prop, session_maker=session_maker)
-        return sorted(res, key=lambda x: x[0])
+        return sorted(res, key=itemgetter(0))
 
 
 class CeleryTasksAdmin(ModelView, model=CeleryTasksModel):
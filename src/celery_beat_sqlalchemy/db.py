@@ -3,10 +3,36 @@ from collections.abc import Generator
 from typing import Any
 
 from celery import current_app as celery_app
-from sqlalchemy import NullPool, create_engine
+from sqlalchemy import Insert, QueuePool, create_engine, make_url
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import Session
 
-engine = create_engine(url=celery_app.conf.beat_db_scheduler_dsn, future=True, poolclass=NullPool)
+
+def get_engine_options(url) -> dict[str, Any]:
+    """Dialect specific engine options."""
+    url = make_url(url)
+    options = {}
+    if issubclass(url.get_dialect().get_pool_class(url), QueuePool):
+        # Beat is a single long-lived process: keep a couple of warm connections
+        options.update(pool_size=2, max_overflow=0)
+    if url.get_driver_name() == "psycopg2":
+        # Send executemany statements (bulk update) in pages instead of one by one
+        options.update(
+            executemany_mode="values_plus_batch",
+            executemany_batch_page_size=500,
+            insertmanyvalues_page_size=1000,
+        )
+    return options
+
+
+engine = create_engine(
+    url=celery_app.conf.beat_db_scheduler_dsn,
+    future=True,
+    pool_pre_ping=True,
+    pool_recycle=1800,
+    **get_engine_options(celery_app.conf.beat_db_scheduler_dsn),
+)
 
 
 @contextlib.contextmanager
@@ -16,3 +42,25 @@ def db_sessionmaker() -> Generator[Session, Any, None]:
         bind=conn, expire_on_commit=False, autoflush=False
     ) as session:
         yield session
+
+
+@contextlib.contextmanager
+def db_session_scope(session: Session | None = None) -> Generator[Session, Any, None]:
+    """Use the given session or open a new one with its own transaction."""
+    if session is not None:
+        yield session
+        return
+    with db_sessionmaker() as new_session, new_session.begin():
+        yield new_session
+
+
+def insert_on_conflict_do_nothing(model, index_elements: list) -> Insert | None:
+    """
+    Insert statement skipping rows which violate the unique index_elements constraint.
+    Return None if the database dialect doesn't support it.
+    """
+    if engine.dialect.name == "postgresql":
+        return pg_insert(model).on_conflict_do_nothing(index_elements=index_elements)
+    if engine.dialect.name == "sqlite":
+        return sqlite_insert(model).on_conflict_do_nothing(index_elements=index_elements)
+    return None
@@ -10,9 +10,9 @@ from sqlalchemy import (
     select,
     update,
 )
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import Session, relationship
 
-from ..db import db_sessionmaker
+from ..db import db_session_scope, insert_on_conflict_do_nothing
 from ..schemas.db.celery_tasks import CeleryTasksDbSchema
 from .base import CeleryTasksScheduleBase
 
@@ -37,18 +37,36 @@ class CeleryTasksModel(CeleryTasksScheduleBase):
     )
 
     @classmethod
-    def bulk_insert(cls, data: list[CeleryTasksDbSchema]):
-        with db_sessionmaker() as session, session.begin():
-            existing_tasks = set((session.execute(select(cls.task))).scalars().all())
-            tasks_to_insert = {d.task for d in data}
-            missing_tasks = tasks_to_insert - existing_tasks
-            if missing_tasks:
-                stmt = insert(cls).values(**CeleryTasksDbSchema.get_bindparams())
-                session.execute(stmt, [d.model_dump() for d in data if d.task in missing_tasks])
+    def bulk_insert(cls, data: list[CeleryTasksDbSchema], session: Session | None = None):
+        with db_session_scope(session) as db_session:
+            stmt = insert_on_conflict_do_nothing(cls, index_elements=[cls.task])
+            if stmt is None:
+                stmt = select(cls.task).where(cls.task.in_([d.task for d in data]))
+                existing_tasks = set((db_session.execute(stmt)).scalars().all())
+                data = [d for d in data if d.task not in existing_tasks]
+                stmt = insert(cls)
+            if data:
+                stmt = stmt.values(**CeleryTasksDbSchema.get_bindparams())
+                db_session.execute(stmt, [d.model_dump() for d in data])
 
     @classmethod
-    def bulk_update(cls, data: list[CeleryTasksDbSchema]):
-        with db_sessionmaker() as session, session.begin():
+    def bulk_update(cls, data: list[CeleryTasksDbSchema], session: Session | None = None):
+        with db_session_scope(session) as db_session:
+            # Send updates only for the tasks which have actually changed
+            stmt = select(cls.task, cls.params, cls.description).where(
+                cls.task.in_([d.task for d in data])
+            )
+            db_values = {
+                row.task: (row.params, row.description) for row in db_session.execute(stmt)
+            }
+            data = [
+                d
+                for d in data
+                if d.task in db_values and db_values[d.task] != (d.params, d.description)
+            ]
+            if not data:
+                return
+
             stmt = (
                 update(cls)
                 .where(
@@ -61,19 +79,31 @@ class CeleryTasksModel(CeleryTasksScheduleBase):
                 .values(**CeleryTasksDbSchema.get_bindparams(exclude=["tags"]))
                 .execution_options(synchronize_session=None)
             )
-            session.connection().execute(stmt, [d.model_dump() for d in data])
+            db_session.connection().execute(stmt, [d.model_dump() for d in data])
 
     @classmethod
-    def select_all_tasks(cls) -> list[str]:
-        with db_sessionmaker() as session, session.begin():
+    def select_all_tasks(cls, session: Session | None = None) -> list[str]:
+        with db_session_scope(session) as db_session:
             stmt = select(cls.task)
-            return (session.execute(stmt)).scalars().all()
+            return (db_session.execute(stmt)).scalars().all()
+
+    @classmethod
+    def count_tasks(cls, tasks: list[str], session: Session | None = None) -> int:
+        with db_session_scope(session) as db_session:
+            stmt = select(func.count()).select_from(cls).where(cls.task.in_(tasks))
+            return (db_session.execute(stmt)).scalar_one()
 
     @classmethod
-    def delete(cls, tasks: list[str]):
-        with db_sessionmaker() as session, session.begin():
+    def delete(cls, tasks: list[str], session: Session | None = None):
+        with db_session_scope(session) as db_session:
             stmt = delete(cls).where(cls.task.in_(tasks))
-            session.execute(stmt)
+            db_session.execute(stmt)
+
+    @classmethod
+    def delete_not_in(cls, tasks: list[str], session: Session | None = None):
+        with db_session_scope(session) as db_session:
+            stmt = delete(cls).where(cls.task.not_in(tasks))
+            db_session.execute(stmt)
 
     def __repr__(self):
         return f"{self.task}"
@@ -0,0 +1,37 @@
+from sqlalchemy import (
+    BigInteger,
+    Column,
+    String,
+    insert,
+    select,
+    update,
+)
+from sqlalchemy.orm import Session
+
+from ..db import db_session_scope
+from .base import CeleryTasksScheduleBase
+
+
+class CeleryTasksMetaModel(CeleryTasksScheduleBase):
+    """Keeps checksum of application tasks last saved to celery_tasks table."""
+
+    __tablename__ = "celery_tasks_meta"
+
+    id = Column(BigInteger, primary_key=True)
+    tasks_hash = Column(String, nullable=True)
+
+    @classmethod
+    def get_tasks_hash(cls, session: Session | None = None) -> str | None:
+        with db_session_scope(session) as db_session:
+            stmt = select(cls.tasks_hash).where(cls.id == 1)
+            return (db_session.execute(stmt)).scalars().first()
+
+    @classmethod
+    def update_tasks_hash(cls, tasks_hash: str, session: Session | None = None):
+        with db_session_scope(session) as db_session:
+            stmt = update(cls).where(cls.id == 1).values(tasks_hash=tasks_hash)
+            if not (db_session.execute(stmt)).rowcount:
+                db_session.execute(insert(cls).values(id=1, tasks_hash=tasks_hash))
+
+    def __repr__(self):
+        return f"{self.tasks_hash}"
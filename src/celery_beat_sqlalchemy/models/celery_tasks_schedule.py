@@ -1,9 +1,10 @@
-import json
-from json import JSONDecodeError
+import datetime as dt
+from collections.abc import Generator
+from typing import Any
 
+import orjson
 from celery import current_app as celery_app
 from celery.beat import debug
-from celery.schedules import crontab
 from sqlalchemy import (
     BigInteger,
     Boolean,
@@ -11,6 +12,7 @@ from sqlalchemy import (
     DateTime,
     ForeignKey,
     String,
+    and_,
     delete,
     event,
     func,
@@ -18,11 +20,11 @@ from sqlalchemy import (
     select,
     true,
 )
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import Session, relationship
 
-from ..db import db_sessionmaker
+from ..db import db_session_scope, db_sessionmaker, insert_on_conflict_do_nothing
 from ..schemas.db.celery_tasks_schedule import CeleryTasksScheduleDbSchema
-from ..utils import get_task_key
+from ..utils import get_task_key, parse_crontab
 from .base import CeleryTasksScheduleBase
 from .celery_tasks_schedule_meta import CeleryTasksScheduleMetaModel
 
@@ -77,34 +79,56 @@ class CeleryTasksScheduleModel(CeleryTasksScheduleBase):
     task_head = relationship("CeleryTasksModel", back_populates="scheduled_tasks", lazy="selectin")
 
     @classmethod
-    def bulk_insert(cls, data: list[CeleryTasksScheduleDbSchema]):
-        with db_sessionmaker() as session, session.begin():
-            existing_entries = set((session.execute(select(cls.task_key))).scalars().all())
-            entries_to_insert = {d.task_key for d in data}
-            missing_entries = entries_to_insert - existing_entries
-            if missing_entries:
-                stmt = insert(cls).values(**CeleryTasksScheduleDbSchema.get_bindparams())
-                session.execute(
-                    stmt, [d.model_dump() for d in data if d.task_key in missing_entries]
-                )
+    def bulk_insert(cls, data: list[CeleryTasksScheduleDbSchema], session: Session | None = None):
+        with db_session_scope(session) as db_session:
+            stmt = insert_on_conflict_do_nothing(cls, index_elements=[cls.task_key])
+            if stmt is None:
+                stmt = select(cls.task_key).where(cls.task_key.in_([d.task_key for d in data]))
+                existing_entries = set((db_session.execute(stmt)).scalars().all())
+                data = [d for d in data if d.task_key not in existing_entries]
+                stmt = insert(cls)
+            if data:
+                stmt = stmt.values(**CeleryTasksScheduleDbSchema.get_bindparams())
+                db_session.execute(stmt, [d.model_dump() for d in data])
 
     @classmethod
-    def select_all_tasks(cls) -> list[str]:
-        with db_sessionmaker() as session, session.begin():
+    def select_all_tasks(cls, session: Session | None = None) -> list[str]:
+        with db_session_scope(session) as db_session:
             stmt = select(cls.task)
-            return (session.execute(stmt)).scalars().all()
+            return (db_session.execute(stmt)).scalars().all()
 
     @classmethod
-    def select_enabled_entries(cls):
+    def select_enabled_entries(cls) -> Generator["CeleryTasksScheduleModel", Any, None]:
+        """Stream enabled entries in batches instead of loading them all at once."""
         with db_sessionmaker() as session, session.begin():
-            stmt = select(cls).where(cls.enabled)
-            return (session.execute(stmt)).scalars().all()
+            stmt = select(cls).where(cls.enabled).execution_options(yield_per=500)
+            yield from (session.execute(stmt)).scalars()
 
     @classmethod
-    def delete(cls, tasks: list[str]):
+    def select_enabled_entries_updated_since(
+        cls, since: dt.datetime
+    ) -> Generator[tuple[bool, "CeleryTasksScheduleModel | None"], Any, None]:
+        """
+        Check whether the schedule was updated after `since` and stream enabled entries if so.
+        Rows are (updated, entry) pairs. If there were no updates, the only row is (False, None).
+        """
+        meta = CeleryTasksScheduleMetaModel
         with db_sessionmaker() as session, session.begin():
+            updated = meta.last_updated_at > since
+            stmt = (
+                select(updated, cls)
+                .select_from(meta)
+                .outerjoin(cls, and_(cls.enabled, updated))
+                .where(meta.id == 1)
+                .execution_options(yield_per=500)
+            )
+            yield from (session.execute(stmt)).tuples()
+
+    @classmethod
+    def delete(cls, tasks: list[str], session: Session | None = None):
+        with db_session_scope(session) as db_session:
             stmt = delete(cls).where(cls.task.in_(tasks))
-            session.execute(stmt)
+            db_session.execute(stmt)
 
     def __repr__(self):
         return (
@@ -124,22 +148,16 @@ def before_update_handler(mapper, connection, target: CeleryTasksScheduleModel):
     before_validator(mapper, connection, target)
 
 
-@event.listens_for(CeleryTasksScheduleModel, "after_insert")
-def after_insert_handler(mapper, connection, target: CeleryTasksScheduleModel):
-    """Update when schedule entry was modified."""
-    CeleryTasksScheduleMetaModel.update_last_updated_at()
-
-
-@event.listens_for(CeleryTasksScheduleModel, "after_update")
-def after_update_handler(mapper, connection, target: CeleryTasksScheduleModel):
-    """Update when schedule entry was modified."""
-    CeleryTasksScheduleMetaModel.update_last_updated_at()
-
-
-@event.listens_for(CeleryTasksScheduleModel, "after_delete")
-def after_delete_handler(mapper, connection, target: CeleryTasksScheduleModel):
-    """Update when schedule entry was modified."""
-    CeleryTasksScheduleMetaModel.update_last_updated_at()
+@event.listens_for(Session, "after_flush")
+def after_flush_handler(session: Session, flush_context):
+    """Update once per flush when schedule entries were modified."""
+    modified = (
+        *session.new,
+        *session.deleted,
+        *(obj for obj in session.dirty if session.is_modified(obj)),
+    )
+    if any(isinstance(obj, CeleryTasksScheduleModel) for obj in modified):
+        CeleryTasksScheduleMetaModel.update_last_updated_at(session=session)
 
 
 def before_validator(mapper, connection, target):
@@ -148,13 +166,13 @@ def before_validator(mapper, connection, target):
         raise RuntimeError(f"Task '{target.task}' does not exist")
 
     try:
-        args = json.loads(target.args)
-    except JSONDecodeError as e:
+        args = orjson.loads(target.args)
+    except orjson.JSONDecodeError as e:
         raise RuntimeError(f"Invalid format for task positional arguments: {e}")
 
     try:
-        kwargs = json.loads(target.kwargs)
-    except JSONDecodeError as e:
+        kwargs = orjson.loads(target.kwargs)
+    except orjson.JSONDecodeError as e:
         raise RuntimeError(f"Invalid format for task keyword arguments: {e}")
 
     task = celery_app.tasks[target.task]
@@ -166,14 +184,7 @@ def before_validator(mapper, connection, target):
         check_arguments(*(args or ()), **(kwargs or {}))
 
     try:
-        minute, hour, day_of_month, month_of_year, day_of_week = target.schedule.split()
-        crontab(
-            minute=minute,
-            hour=hour,
-            day_of_week=day_of_week,
-            day_of_month=day_of_month,
-            month_of_year=month_of_year,
-        )
+        parse_crontab(target.schedule)
     except Exception as e:
         raise RuntimeError(f"Invalid schedule: {e}")
 
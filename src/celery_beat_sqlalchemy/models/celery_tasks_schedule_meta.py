@@ -9,8 +9,9 @@ from sqlalchemy import (
     select,
     update,
 )
+from sqlalchemy.orm import Session
 
-from ..db import db_sessionmaker
+from ..db import db_session_scope, db_sessionmaker
 from .base import CeleryTasksScheduleBase
 
 
@@ -31,10 +32,10 @@ class CeleryTasksScheduleMetaModel(CeleryTasksScheduleBase):
                 session.execute(stmt)
 
     @classmethod
-    def update_last_updated_at(cls):
-        with db_sessionmaker() as session, session.begin():
+    def update_last_updated_at(cls, session: Session | None = None):
+        with db_session_scope(session) as db_session:
             stmt = update(cls).where(cls.id == 1).values(last_updated_at=dt.datetime.now(tz=dt.UTC))
-            session.execute(stmt)
+            db_session.execute(stmt)
 
     @classmethod
     def get_last_updated_at(cls) -> dt.datetime:
@@ -1,22 +1,35 @@
 import datetime as dt
 import enum
 import inspect
-import json
+import itertools
 import time
+from collections.abc import Iterable
+from dataclasses import astuple
+from typing import Any
 
+import orjson
 from celery.beat import ScheduleEntry, Scheduler, debug, error
-from celery.schedules import crontab
 from celery.utils.time import get_exponential_backoff_interval
 from sqlalchemy.exc import DatabaseError
+from sqlalchemy.orm import Session
 
-from .db import engine
+from .db import db_sessionmaker, engine
 from .models.base import CeleryTasksScheduleBase
 from .models.celery_tasks import CeleryTasksModel
+from .models.celery_tasks_meta import CeleryTasksMetaModel
 from .models.celery_tasks_schedule import CeleryTasksScheduleModel
 from .models.celery_tasks_schedule_meta import CeleryTasksScheduleMetaModel
 from .schemas.db.celery_tasks import CeleryTasksDbSchema
 from .schemas.db.celery_tasks_schedule import CeleryTasksScheduleDbSchema
-from .utils import get_task_category, get_task_key
+from .utils import (
+    get_checksum,
+    get_schema_signature,
+    get_task_category,
+    get_task_key,
+    parse_crontab,
+    read_local_cache,
+    write_local_cache,
+)
 
 DEFAULT_MAX_LOOP_INTERVAL = 5  # seconds
 MAX_SYNC_SCHEDULE_INTERVAL = 5  # minutes
@@ -27,14 +40,18 @@ class DatabaseScheduler(Scheduler):
     """Database-backed Beat Scheduler."""
 
     ModelTask = CeleryTasksModel
+    ModelTaskMeta = CeleryTasksMetaModel
     ModelSchedule = CeleryTasksScheduleModel
     ModelMeta = CeleryTasksScheduleMetaModel
 
     _schedule = None
     _last_updated_at = None
+    _last_updated_monotonic = None
 
     def __init__(self, *args, **kwargs):
         """Initialize the database scheduler."""
+        # task_key -> (source db values, parsed entry fields)
+        self._entry_cache: dict[str, tuple[tuple[str, ...], dict[str, Any]]] = {}
         Scheduler.__init__(self, *args, **kwargs)
         self.max_interval = (
             kwargs.get("max_interval")
@@ -42,12 +59,15 @@ class DatabaseScheduler(Scheduler):
             or DEFAULT_MAX_LOOP_INTERVAL
         )
 
+    @property
+    def _local_cache_key(self) -> str:
+        return engine.url.render_as_string(hide_password=True)
+
     @property
     def schedule(self):
         self._schedule = self._schedule or {}
         try:
-            if self._need_update():
-                self._update_schedule()
+            self._sync_schedule()
         except DatabaseError as e:
             error(f"Failed to update beat schedule: {e}")
         return self._schedule
@@ -56,14 +76,22 @@ class DatabaseScheduler(Scheduler):
         debug("Setup schedule")
         self._prepare_models()
         try:
-            self._clean_deprecated()
-            self._fill_celery_tasks()
-            self._fill_celery_tasks_schedule()
+            with db_sessionmaker() as session, session.begin():
+                self._clean_deprecated(session=session)
+                self._fill_celery_tasks(session=session)
+                self._fill_celery_tasks_schedule(session=session)
             self._update_schedule()
+        except DatabaseError as e:
+            error(f"Failed to setup beat schedule: {e}")
+            # Some tables may be missing: don't skip create_all on the next start
+            try:
+                write_local_cache(self._local_cache_key, schema=None)
+            except OSError as cache_error:
+                debug(f"Failed to reset cached db schema signature: {cache_error}")
         except Exception as e:
             error(f"Failed to setup beat schedule: {e}")
 
-    def _fill_celery_tasks(self):
+    def _fill_celery_tasks(self, session: Session | None = None):
         """Fill celery_tasks table with application celery tasks."""
 
         def convert_type(param_type) -> str:
@@ -99,13 +127,27 @@ class DatabaseScheduler(Scheduler):
                     description=inspect.getdoc(task) if task.__doc__ else "",
                     tags=get_task_category(task.__module__),
                 )
-                for task_name, task in sorted(self.app.tasks.items(), key=lambda item: item[0])
+                for task_name, task in self.app.tasks.items()
                 if not task_name.startswith("celery.")
             ]
-            self.ModelTask.bulk_insert(data=db_entries)
-            self.ModelTask.bulk_update(data=db_entries)
+            self._save_celery_tasks(db_entries=db_entries, session=session)
 
-    def _fill_celery_tasks_schedule(self):
+    def _save_celery_tasks(
+        self, db_entries: list[CeleryTasksDbSchema], session: Session | None = None
+    ):
+        """Save application tasks unless they haven't changed since the last start."""
+        tasks_hash = get_checksum(sorted(map(astuple, db_entries)))
+        if self.ModelTaskMeta.get_tasks_hash(session=session) == tasks_hash:
+            # The table may have been modified outside the scheduler: check all tasks are there
+            tasks = [entry.task for entry in db_entries]
+            if self.ModelTask.count_tasks(tasks=tasks, session=session) == len(tasks):
+                debug("Application tasks have not changed")
+                return
+        self.ModelTask.bulk_insert(data=db_entries, session=session)
+        self.ModelTask.bulk_update(data=db_entries, session=session)
+        self.ModelTaskMeta.update_tasks_hash(tasks_hash=tasks_hash, session=session)
+
+    def _fill_celery_tasks_schedule(self, session: Session | None = None):
         """Fill celery_tasks_schedule table with application beat schedule."""
         if self.app.conf.beat_schedule:
             comment = (
@@ -115,8 +157,8 @@ class DatabaseScheduler(Scheduler):
                 CeleryTasksScheduleDbSchema(
                     task_key=get_task_key(task["task"], task["args"], task["kwargs"]),
                     task=task["task"],
-                    args=json.dumps(task["args"]),
-                    kwargs=json.dumps(task["kwargs"]),
+                    args=orjson.dumps(task["args"]).decode(),
+                    kwargs=orjson.dumps(task["kwargs"]).decode(),
                     schedule=(
                         f"{task['schedule']._orig_minute} "
                         f"{task['schedule']._orig_hour} "
@@ -128,7 +170,7 @@ class DatabaseScheduler(Scheduler):
                 )
                 for task in self.app.conf.beat_schedule.values()
             ]
-            self.ModelSchedule.bulk_insert(data=db_entries)
+            self.ModelSchedule.bulk_insert(data=db_entries, session=session)
 
     def update_from_dict(self, dict_):
         self._schedule = self._schedule or {}
@@ -136,65 +178,88 @@ class DatabaseScheduler(Scheduler):
             {name: self._maybe_entry(name, entry) for name, entry in dict_.items()}
         )
 
-    def _need_update(self) -> bool:
-        now = dt.datetime.now(tz=dt.UTC)
-
+    def _sync_schedule(self):
         if self.max_interval < 30:  # noqa
             # Don't update at the beginning and at the end of a minute
             # to avoid overriding current heap
-            if 0 <= now.second < 20 or now.second > 50:  # noqa
-                return False
+            second = int(time.time()) % 60
+            if 0 <= second < 20 or second > 50:  # noqa
+                return
 
         # Sync beat schedule with db every 5 minutes
         # in case we didn't get sqlalchemy update event
-        sync_threshold = now - dt.timedelta(minutes=MAX_SYNC_SCHEDULE_INTERVAL)
-
-        if (  # noqa
-            self._last_updated_at is None
-            or self._last_updated_at < sync_threshold
-            or self._last_updated_at < self.ModelMeta.get_last_updated_at()
+        if (
+            self._last_updated_monotonic is None
+            or time.monotonic() - self._last_updated_monotonic > MAX_SYNC_SCHEDULE_INTERVAL * 60
         ):
-            return True
-        return False
+            self._update_schedule()
+            return
 
-    def _update_schedule(self):
-        enabled_tasks = self._get_enabled_tasks()
+        # Check for schedule updates and fetch the updated entries in one query
+        rows = self.ModelSchedule.select_enabled_entries_updated_since(since=self._last_updated_at)
+        updated, first_row = next(rows, (False, None))
+        if not updated:
+            rows.close()
+            return
+        entries = itertools.chain([first_row], (row for _, row in rows))
+        self._update_schedule(rows=(row for row in entries if row is not None))
+
+    def _update_schedule(self, rows: Iterable[CeleryTasksScheduleModel] | None = None):
+        enabled_tasks = self._get_enabled_tasks(rows=rows)
         self._schedule = enabled_tasks
         self._last_updated_at = dt.datetime.now(tz=dt.UTC)
+        self._last_updated_monotonic = time.monotonic()
         self.install_default_entries(self._schedule)
         debug("Current schedule:\n" + "\n".join(repr(entry) for entry in self._schedule.values()))
 
-    def _get_enabled_tasks(self) -> dict[str, ScheduleEntry]:
+    def _get_enabled_tasks(
+        self, rows: Iterable[CeleryTasksScheduleModel] | None = None
+    ) -> dict[str, ScheduleEntry]:
         """Return list of enabled periodic tasks."""
-        rows = self.ModelSchedule.select_enabled_entries()
+        if rows is None:
+            rows = self.ModelSchedule.select_enabled_entries()
         entries = {}
         for row in rows:
             try:
                 entries[row.task_key] = self._model_to_entry(model=row)
             except Exception as e:
                 error(str(e))
+        self._entry_cache = {
+            key: value for key, value in self._entry_cache.items() if key in entries
+        }
         return entries
 
     def _model_to_entry(self, model: CeleryTasksScheduleModel) -> ScheduleEntry:
-        args = json.loads(model.args)
-        kwargs = json.loads(model.kwargs)
-        minute, hour, day_of_month, month_of_year, day_of_week = model.schedule.split()
-        schedule = crontab(
-            minute=minute,
-            hour=hour,
-            day_of_week=day_of_week,
-            day_of_month=day_of_month,
-            month_of_year=month_of_year,
-        )
+        # Reuse parsed args/kwargs/crontab while the db entry is unchanged.
+        # A new ScheduleEntry is still created, so last_run_at is reset as before.
+        source = (model.task, model.args, model.kwargs, model.schedule)
+        cached_source, entry_dict = self._entry_cache.get(model.task_key, ((), {}))
+        if cached_source == source:
+            return self._maybe_entry(model.task_key, entry_dict)
+
+        args = orjson.loads(model.args)
+        kwargs = orjson.loads(model.kwargs)
         entry_dict = {
             "task": model.task,
             "args": args,
             "kwargs": kwargs,
-            "schedule": schedule,
+            "schedule": parse_crontab(model.schedule),
         }
+        self._entry_cache[model.task_key] = (source, entry_dict)
         return self._maybe_entry(model.task_key, entry_dict)
 
     def _prepare_models(self):
+        # The tables only change between deploys: skip create_all if it already
+        # ran for the current schema and the tables are still there.
+        schema_signature = get_schema_signature(CeleryTasksScheduleBase.metadata)
+        if read_local_cache(self._local_cache_key).get("schema") == schema_signature:
+            try:
+                self.ModelMeta.init_last_updated_at()
+            except DatabaseError as e:
+                debug(f"Cached schema is out of date, creating tables: {e}")
+            else:
+                return
+
         # ###
         # COPIED from: celery.backends.database.session.SessionManager.prepare_models
         # ###
@@ -217,11 +282,11 @@ class DatabaseScheduler(Scheduler):
                 break
 
         self.ModelMeta.init_last_updated_at()
+        try:
+            write_local_cache(self._local_cache_key, schema=schema_signature)
+        except OSError as e:
+            debug(f"Failed to cache db schema signature: {e}")
 
-    def _clean_deprecated(self):
+    def _clean_deprecated(self, session: Session | None = None):
         """Sync celery_tasks table with application tasks."""
-        tasks = set(self.app.tasks)
-        db_tasks = set(self.ModelTask.select_all_tasks())
-        deprecated_tasks = db_tasks - tasks
-        if deprecated_tasks:
-            self.ModelTask.delete(tasks=list(deprecated_tasks))
+        self.ModelTask.delete_not_in(tasks=list(self.app.tasks), session=session)
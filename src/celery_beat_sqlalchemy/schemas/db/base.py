@@ -1,3 +1,4 @@
+import functools
 from dataclasses import dataclass, fields
 
 from sqlalchemy import bindparam
@@ -7,12 +8,20 @@ from ...utils import db_bindparam
 
 @dataclass
 class BindparamDbSchema:
+    @classmethod
+    @functools.cache
+    def _bindparam_names(cls) -> tuple[tuple[str, str], ...]:
+        """Pairs of (field name, bindparam name), computed once per schema."""
+        return tuple((f.name, db_bindparam(f.name)) for f in fields(cls))
+
+    @classmethod
+    @functools.cache
+    def _get_bindparams(cls, exclude: tuple[str, ...]):
+        return {name: bindparam(key) for name, key in cls._bindparam_names() if name not in exclude}
+
     @classmethod
     def get_bindparams(cls, exclude: list[str] | None = None):
-        exclude = exclude or []
-        return {
-            f.name: bindparam(db_bindparam(f.name)) for f in fields(cls) if f.name not in exclude
-        }
+        return dict(cls._get_bindparams(tuple(exclude or ())))
 
     def model_dump(self):
-        return {db_bindparam(f.name): getattr(self, f.name) for f in fields(self)}
+        return {key: getattr(self, name) for name, key in self._bindparam_names()}
@@ -1,4 +1,15 @@
-import re
+import functools
+import hashlib
+import os
+from pathlib import Path
+from typing import Any
+
+import orjson
+from celery.schedules import crontab
+from sqlalchemy import MetaData
+
+# Zabbix compatible key format: 0-9a-zA-Z_-.
+_TASK_KEY_DELETE_TABLE = str.maketrans("", "", "[](){}, '\"")
 
 
 def get_task_key(name, args, kwargs) -> str:
@@ -9,8 +20,23 @@ def get_task_key(name, args, kwargs) -> str:
     """
     args = "-".join(map(str, args))
     kwargs = "-".join([f"{k}-{v}" for k, v in kwargs.items()])
-    # Zabbix compatible key format: 0-9a-zA-Z_-.
-    return re.sub(r"[\[\](){}, '\"]", "", f"{name}-{args}-{kwargs}".strip("-"))
+    return f"{name}-{args}-{kwargs}".strip("-").translate(_TASK_KEY_DELETE_TABLE)
+
+
+@functools.lru_cache(maxsize=1024)
+def parse_crontab(schedule: str) -> crontab:
+    """
+    Get crontab from schedule string: minute hour day_of_month month_of_year day_of_week.
+    Parsed crontabs are cached as the same schedules are validated and loaded repeatedly.
+    """
+    minute, hour, day_of_month, month_of_year, day_of_week = schedule.split()
+    return crontab(
+        minute=minute,
+        hour=hour,
+        day_of_week=day_of_week,
+        day_of_month=day_of_month,
+        month_of_year=month_of_year,
+    )
 
 
 def get_task_category(task_module: str):
@@ -25,3 +51,51 @@ def get_task_category(task_module: str):
 def db_bindparam(name: str) -> str:
     """Sqlalchemy bindparam alias generator."""
     return f"{name}_value"
+
+
+def get_checksum(data) -> str:
+    """Checksum of json serializable data."""
+    return hashlib.sha256(orjson.dumps(data)).hexdigest()
+
+
+def get_schema_signature(metadata: MetaData) -> str:
+    """Checksum of the tables and their columns defined in metadata."""
+    tables = sorted(
+        (table.name, tuple(column.name for column in table.columns))
+        for table in metadata.tables.values()
+    )
+    return hashlib.sha256(repr(tables).encode()).hexdigest()
+
+
+def get_local_cache_path(dsn: str) -> Path | None:
+    """
+    Local cache file of the scheduler state for the given database.
+    None if there is no cache directory (no XDG_CACHE_HOME and no home directory).
+    """
+    cache_dir = os.environ.get("XDG_CACHE_HOME")
+    if not cache_dir:
+        try:
+            cache_dir = Path.home() / ".cache"
+        except RuntimeError:
+            return None
+    return Path(cache_dir) / "celery_beat_sqla" / hashlib.sha256(dsn.encode()).hexdigest()
+
+
+def read_local_cache(dsn: str) -> dict[str, Any]:
+    """Read the scheduler state cached for the given database, empty if there is none."""
+    path = get_local_cache_path(dsn)
+    if path is None:
+        return {}
+    try:
+        return orjson.loads(path.read_bytes())
+    except (OSError, orjson.JSONDecodeError):
+        return {}
+
+
+def write_local_cache(dsn: str, **values):
+    """Update the scheduler state cached for the given database."""
+    path = get_local_cache_path(dsn)
+    if path is None:
+        return
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(orjson.dumps({**read_local_cache(dsn), **values}))